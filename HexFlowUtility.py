@@ -4,37 +4,31 @@ import json
 import time
 import warnings
 import platform
+import collections
+import codecs
+import functools
 from datetime import datetime
 
-# Suppress urllib3 OpenSSL/LibreSSL warning BEFORE importing requests
+# Suppress urllib3 OpenSSL/LibreSSL warning BEFORE requests is imported (see _requests)
 warnings.filterwarnings('ignore', message='.*urllib3.*OpenSSL.*')
 warnings.filterwarnings('ignore', message='.*NotOpenSSLWarning.*')
 warnings.filterwarnings('ignore', category=UserWarning, message='.*urllib3.*')
-try:
-    import urllib3
-    urllib3.disable_warnings()
-    # Specifically disable NotOpenSSLWarning if it exists
-    try:
-        urllib3.disable_warnings(urllib3.exceptions.NotOpenSSLWarning)
-    except (AttributeError, NameError):
-        pass
-except ImportError:
-    pass
 
-import requests
-import serial.tools.list_ports
-from typing import Optional
-import io
-import contextlib
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    # Imported lazily at runtime, see _requests() and SerialReader.run
+    import requests
+    import serial
+import runpy
 
-# Also suppress via requests (in case warnings were already emitted)
 try:
-    requests.packages.urllib3.disable_warnings()
-except (AttributeError, ImportError):
-    pass
+    import orjson
+except ImportError:
+    orjson = None
 
-from PySide6.QtCore import QProcess, Qt, Signal, QThread
-from PySide6.QtGui import QFont
+from PySide6.QtCore import QObject, QProcess, QProcessEnvironment, Qt, Signal, QThread, QTimer
+from PySide6.QtGui import QCloseEvent, QFont, QFontDatabase, QTextCursor
 from PySide6.QtWidgets import (
     QApplication,
     QComboBox,
@@ -56,6 +50,7 @@ from PySide6.QtWidgets import (
 )
 
  
+@functools.lru_cache(maxsize=None)
 def resource_path(filename):
     """Get the path to a resource file, handling both development and PyInstaller bundle modes."""
     if getattr(sys, 'frozen', False):
@@ -77,36 +72,206 @@ BOOTLOADER_PATH = resource_path("bootloader.bin")
 PARTITIONS_PATH = resource_path("partitions.bin")
 DEFAULT_HOST = "hadasklugv2-dev.smartguest.ai"
 FLASH_PASSWORD = "qwertyuiop"
+ESPTOOL_ARG = "--run-esptool"  # Re-invokes a bundled executable as esptool
 CONFIG_FILE = resource_path("config.json")
+FIRMWARE_CACHE_FILE = resource_path("firmware_cache.json")
+FIRMWARE_CACHE_TTL = 60  # seconds before a cached firmware list is revalidated
+
+# Application-wide stylesheet, set once on QApplication so Qt parses it a single time.
+# Flash/erase buttons get red/orange backgrounds with hover/pressed effects.
+APP_STYLESHEET = (
+    "QPushButton#flashBtn {"
+    "  background-color: #dc3545;"
+    "  color: white;"
+    "  font-weight: bold;"
+    "  border: none;"
+    "  padding: 5px;"
+    "}"
+    "QPushButton#flashBtn:hover {"
+    "  background-color: #c82333;"
+    "}"
+    "QPushButton#flashBtn:pressed {"
+    "  background-color: #bd2130;"
+    "}"
+    "QPushButton#eraseBtn {"
+    "  background-color: #fd7e14;"
+    "  color: white;"
+    "  font-weight: bold;"
+    "  border: none;"
+    "  padding: 5px;"
+    "}"
+    "QPushButton#eraseBtn:hover {"
+    "  background-color: #e86809;"
+    "}"
+    "QPushButton#eraseBtn:pressed {"
+    "  background-color: #d65805;"
+    "}"
+)
+
+
+def _json_loads(data):
+    """Parse JSON from bytes or str, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj) -> bytes:
+    """Serialize obj to indented UTF-8 JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode("utf-8")
 
 
+@functools.lru_cache(maxsize=1)
 def load_config() -> dict:
-    """Load configuration from JSON file, return default if not exists."""
+    """Load configuration from JSON file, return default if not exists.
+
+    The result is cached until the next save_config() call.
+    """
     default_config = {
         "host": DEFAULT_HOST
     }
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-                # Ensure host is set, use default only if completely missing
-                if "host" not in config or not config["host"]:
-                    config["host"] = DEFAULT_HOST
-                return config
-        except Exception:
-            return default_config
-    return default_config
+    try:
+        with open(CONFIG_FILE, 'rb') as f:
+            config = _json_loads(f.read())
+        # Ensure host is set, use default only if completely missing
+        if "host" not in config or not config["host"]:
+            config["host"] = DEFAULT_HOST
+        return config
+    except (OSError, ValueError, TypeError):
+        # Missing/unreadable file (FileNotFoundError is an OSError), invalid JSON,
+        # or JSON that is not an object
+        return default_config
 
 
 def save_config(config: dict) -> None:
     """Save configuration to JSON file."""
     try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=2)
+        with open(CONFIG_FILE, 'wb') as f:
+            f.write(_json_dumps(config))
+    except Exception:
+        pass
+    # Drop the cached config so the next load_config() sees the change
+    load_config.cache_clear()
+
+
+@functools.lru_cache(maxsize=1)
+def _requests():
+    """Import requests on first use to keep it off the startup path."""
+    try:
+        import urllib3
+        urllib3.disable_warnings()
+        # Specifically disable NotOpenSSLWarning if it exists
+        try:
+            urllib3.disable_warnings(urllib3.exceptions.NotOpenSSLWarning)
+        except (AttributeError, NameError):
+            pass
+    except ImportError:
+        pass
+
+    import requests
+
+    # Also suppress via requests (in case warnings were already emitted)
+    try:
+        requests.packages.urllib3.disable_warnings()
+    except (AttributeError, ImportError):
+        pass
+    return requests
+
+
+_session: Optional["requests.Session"] = None
+
+
+def _get_session() -> "requests.Session":
+    """Return the shared HTTP session, creating it on first use.
+
+    Reusing one session keeps connections alive so the firmware list fetch and
+    the firmware download to the same host share a single TCP/TLS connection.
+    """
+    global _session
+    if _session is None:
+        requests = _requests()
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            # Retry transient connection failures and gateway errors with backoff.
+            # Requests run on the UI thread, so read timeouts are not retried
+            # (read=0); otherwise a hung server would freeze the window for
+            # several times the read timeout.
+            max_retries=Retry(
+                total=3,
+                read=0,
+                backoff_factor=0.3,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=["GET"],
+            ),
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Accept-Encoding": "gzip"})
+        _session = session
+    return _session
+
+
+def _load_firmware_cache() -> dict:
+    """Load cached firmware list responses keyed by URL, return empty if unavailable."""
+    try:
+        with open(FIRMWARE_CACHE_FILE, 'rb') as f:
+            cache = _json_loads(f.read())
+        return cache if isinstance(cache, dict) else {}
+    except Exception:
+        return {}
+
+
+def _save_firmware_cache(cache: dict) -> None:
+    """Save cached firmware list responses to the sidecar JSON file."""
+    try:
+        with open(FIRMWARE_CACHE_FILE, 'wb') as f:
+            f.write(_json_dumps(cache))
     except Exception:
         pass
 
 
+def _fetch_firmware_data(api_url: str) -> dict:
+    """Fetch the firmware index, revalidating the on-disk copy with ETag/Last-Modified."""
+    cache = _load_firmware_cache()
+    entry = cache.get(api_url)
+    if isinstance(entry, dict) and "body" in entry:
+        # Skip the request entirely if the cached copy is fresh enough
+        if time.time() - entry.get("fetched_at", 0) < FIRMWARE_CACHE_TTL:
+            return _json_loads(entry["body"])
+    else:
+        entry = None
+
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    res = _get_session().get(api_url, headers=headers, timeout=(3.05, 15))
+    if res.status_code == 304 and entry:
+        entry["fetched_at"] = time.time()
+        _save_firmware_cache(cache)
+        return _json_loads(entry["body"])
+    res.raise_for_status()
+    data = _json_loads(res.content)
+    cache[api_url] = {
+        "etag": res.headers.get("ETag"),
+        "last_modified": res.headers.get("Last-Modified"),
+        "body": res.content.decode("utf-8"),
+        "fetched_at": time.time(),
+    }
+    _save_firmware_cache(cache)
+    return data
+
+
 def get_api_url() -> str:
     """Get API URL from current configuration."""
     config = load_config()
@@ -122,6 +287,23 @@ def get_api_url() -> str:
     return f"https://{host}/webapp/devices/getFirmware"
 
 
+@functools.lru_cache(maxsize=1)
+def _best_monospace() -> QFont:
+    """Pick the first available monospace log font, probing the font database once.
+
+    Requires a QApplication to exist.
+    """
+    families = set(QFontDatabase.families())
+    family = next(
+        (name for name in ("Courier New", "Consolas", "Monaco") if name in families),
+        "Courier New",
+    )
+    font = QFont(family, 14)
+    # Let Qt fall back to the system monospace font if none of the above exist
+    font.setStyleHint(QFont.Monospace)
+    return font
+
+
 class MainWindow(QMainWindow):
     def __init__(self) -> None:
         super().__init__()
@@ -132,9 +314,30 @@ class MainWindow(QMainWindow):
         self.connected_port: Optional[str] = None
         self.downloaded_fw_path: Optional[str] = None
         self.serial_thread: Optional[SerialReader] = None
+        self.port_scanner: Optional[PortScanner] = None
+        self._ports: list = []
         self.auto_scroll_enabled: bool = True
         self.timestamp_enabled: bool = False
 
+        # Log output is queued and flushed to the widget at most once per frame
+        self._log_queue: list[str] = []
+        self._log_at_line_start: bool = True
+        # "HH:MM:SS" for the last formatted second, so only milliseconds change per call
+        self._ts_cache_sec: int = 0
+        self._ts_cache_str: str = ""
+        self._log_flush_timer = QTimer(self)
+        self._log_flush_timer.setInterval(33)
+        self._log_flush_timer.setSingleShot(True)
+        self._log_flush_timer.timeout.connect(self._flush_log)
+        # Export history outlives the capped log view (last 100000 lines)
+        self._full_log_buffer: collections.deque = collections.deque(maxlen=100000)
+
+        # Rescan serial ports periodically while disconnected
+        self._port_rescan_timer = QTimer(self)
+        self._port_rescan_timer.setInterval(3000)
+        self._port_rescan_timer.setSingleShot(True)
+        self._port_rescan_timer.timeout.connect(self._refresh_ports)
+
         self._build_ui()
         self._load_initial_state()
 
@@ -179,41 +382,13 @@ class MainWindow(QMainWindow):
         ports_layout.addWidget(self.host_settings_btn, 3, 2)
 
         self.flash_btn = QPushButton("FLASH")
-        # Set red background color for flash button with hover/pressed effects
-        self.flash_btn.setStyleSheet(
-            "QPushButton {"
-            "  background-color: #dc3545;"
-            "  color: white;"
-            "  font-weight: bold;"
-            "  border: none;"
-            "  padding: 5px;"
-            "}"
-            "QPushButton:hover {"
-            "  background-color: #c82333;"
-            "}"
-            "QPushButton:pressed {"
-            "  background-color: #bd2130;"
-            "}"
-        )
+        # Red background, styled by APP_STYLESHEET
+        self.flash_btn.setObjectName("flashBtn")
         ports_layout.addWidget(self.flash_btn, 3, 3)
 
         self.erase_flash_btn = QPushButton("ERASE FLASH")
-        # Set orange/red background color for erase flash button
-        self.erase_flash_btn.setStyleSheet(
-            "QPushButton {"
-            "  background-color: #fd7e14;"
-            "  color: white;"
-            "  font-weight: bold;"
-            "  border: none;"
-            "  padding: 5px;"
-            "}"
-            "QPushButton:hover {"
-            "  background-color: #e86809;"
-            "}"
-            "QPushButton:pressed {"
-            "  background-color: #d65805;"
-            "}"
-        )
+        # Orange/red background, styled by APP_STYLESHEET
+        self.erase_flash_btn.setObjectName("eraseBtn")
         ports_layout.addWidget(self.erase_flash_btn, 3, 4)
 
         root.addWidget(ports_group)
@@ -253,17 +428,10 @@ class MainWindow(QMainWindow):
         # Serial output log box
         self.log_text = QTextEdit()
         self.log_text.setReadOnly(True)
+        # Bound the document so inserts stay cheap on long runs; Qt drops the oldest blocks
+        self.log_text.document().setMaximumBlockCount(5000)
         # Set monospace font for better log readability
-        font = QFont("Courier New", 14)
-        font.setStyleHint(QFont.Monospace)
-        # Try other common monospace fonts if Courier New isn't available
-        if not font.exactMatch():
-            font = QFont("Consolas", 14)
-            font.setStyleHint(QFont.Monospace)
-        if not font.exactMatch():
-            font = QFont("Monaco", 14)
-            font.setStyleHint(QFont.Monospace)
-        self.log_text.setFont(font)
+        self.log_text.setFont(_best_monospace())
         root.addWidget(self.log_text, 1)
 
         self.setCentralWidget(container)
@@ -283,6 +451,14 @@ class MainWindow(QMainWindow):
         self.export_log_btn.clicked.connect(self._export_log)
         self.clear_log_btn.clicked.connect(self._clear_log)
 
+    def closeEvent(self, event: QCloseEvent) -> None:
+        # Stop rescanning and let an in-flight port scan finish, otherwise Qt aborts
+        # when the QThread is destroyed while still running
+        self._port_rescan_timer.stop()
+        if self.port_scanner and self.port_scanner.isRunning():
+            self.port_scanner.wait()
+        super().closeEvent(event)
+
     def _load_initial_state(self) -> None:
         self._refresh_ports()
         config = load_config()
@@ -293,25 +469,88 @@ class MainWindow(QMainWindow):
         self._load_firmware_list()
 
     def _append_log(self, text: str) -> None:
+        if not self._log_queue:
+            self._log_flush_timer.start()
+        self._log_queue.append(text)
+
+    def _timestamp(self) -> str:
+        """Return a "[HH:MM:SS.mmm] " log prefix, calling strftime at most once per second."""
+        t = time.time()
+        sec = int(t)
+        if sec != self._ts_cache_sec:
+            self._ts_cache_sec = sec
+            self._ts_cache_str = time.strftime("%H:%M:%S", time.localtime(sec))
+        ms = int((t - sec) * 1000)
+        return f"[{self._ts_cache_str}.{ms:03d}] "
+
+    def _flush_log(self) -> None:
+        if not self._log_queue:
+            return
+        text = "".join(self._log_queue)
+        self._log_queue.clear()
         if self.timestamp_enabled:
-            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]  # HH:MM:SS.mmm
-            text = f"[{timestamp}] {text}"
-        # Use insertPlainText instead of append to avoid double newlines
-        # and preserve exact formatting from serial data
-        self.log_text.insertPlainText(text)
-        
+            prefix = self._timestamp()
+            lines = text.splitlines(keepends=True)
+            # Only prefix lines that start fresh, not continuations of a partial line
+            text = "".join([
+                prefix + line if (i or self._log_at_line_start) else line
+                for i, line in enumerate(lines)
+            ])
+        if text:
+            self._log_at_line_start = text[-1] in "\r\n"
+            # One entry per line so maxlen bounds lines, not flush batches.
+            # Normalize line breaks to \n as the view shows them, so a text-mode
+            # export does not turn serial CRLF into \r\r\n on Windows
+            normalized = text.replace("\r\n", "\n").replace("\r", "\n")
+            self._full_log_buffer.extend(normalized.splitlines(keepends=True))
+        # Insert at the end of the document regardless of where the user clicked,
+        # preserving exact formatting from serial data
+        cursor = QTextCursor(self.log_text.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+
         if self.auto_scroll_enabled:
             scrollbar = self.log_text.verticalScrollBar()
             scrollbar.setValue(scrollbar.maximum())
 
     # Serial ports
     def _refresh_ports(self) -> None:
-        self.port_combo.clear()
-        ports = list(serial.tools.list_ports.comports())
-        for p in ports:
-            self.port_combo.addItem(f"{p.device} - {p.description}", p.device)
-        if not ports:
-            self.port_combo.addItem("No ports found", "")
+        # Enumerating ports can block for hundreds of ms on Windows, so scan off the UI thread
+        if self.port_scanner and self.port_scanner.isRunning():
+            return
+        scanner = PortScanner()
+        scanner.ports_ready.connect(self._populate_ports)
+        scanner.finished.connect(self._port_scan_finished)
+        scanner.finished.connect(scanner.deleteLater)
+        self.port_scanner = scanner
+        scanner.start()
+
+    def _populate_ports(self, ports: list) -> None:
+        # Leave the combo (and any open popup) alone if nothing changed
+        if ports == self._ports and self.port_combo.count():
+            return
+        self._ports = ports
+        current = self.port_combo.currentData()
+        # Suspend repaints so the combo relays out once instead of once per item
+        self.port_combo.setUpdatesEnabled(False)
+        try:
+            self.port_combo.clear()
+            for device, description in ports:
+                self.port_combo.addItem(f"{device} - {description}", device)
+            if not ports:
+                self.port_combo.addItem("No ports found", "")
+            # Keep the user's selection across rescans
+            index = self.port_combo.findData(current)
+            if index >= 0:
+                self.port_combo.setCurrentIndex(index)
+        finally:
+            self.port_combo.setUpdatesEnabled(True)
+
+    def _port_scan_finished(self) -> None:
+        if self.port_scanner is self.sender():
+            self.port_scanner = None
+        if not self.connected_port:
+            self._port_rescan_timer.start()
 
     def _toggle_connect(self, checked: bool) -> None:
         if checked:
@@ -323,31 +562,36 @@ class MainWindow(QMainWindow):
             self.connected_port = device
             self.connect_btn.setText("DISCONNECT")
             self._append_log(f"Connected to {device}\n")
+            self._port_rescan_timer.stop()
             self._start_serial_monitor()
         else:
             self._append_log("Disconnected\n")
             self._stop_serial_monitor()
             self.connected_port = None
             self.connect_btn.setText("CONNECT")
+            self._refresh_ports()
 
     # Firmware handling
     def _load_firmware_list(self) -> None:
         try:
             api_url = get_api_url()
-            res = requests.get(api_url, timeout=15)
-            res.raise_for_status()
-            data = res.json()
+            data = _fetch_firmware_data(api_url)
             firmwares = data.get("firmware", [])
         except Exception as exc:
             self._append_log(f"Failed to fetch firmware list: {exc}\n")
             firmwares = []
 
-        self.fw_combo.clear()
-        for item in firmwares:
-            name = f"{item.get('name','fw')} v{item.get('version','')}"
-            self.fw_combo.addItem(name, item)
-        if not firmwares:
-            self.fw_combo.addItem("Browse local…", {})
+        # Suspend repaints so the combo relays out once instead of once per item
+        self.fw_combo.setUpdatesEnabled(False)
+        try:
+            self.fw_combo.clear()
+            for item in firmwares:
+                name = f"{item.get('name','fw')} v{item.get('version','')}"
+                self.fw_combo.addItem(name, item)
+            if not firmwares:
+                self.fw_combo.addItem("Browse local…", {})
+        finally:
+            self.fw_combo.setUpdatesEnabled(True)
 
     def _change_host(self) -> None:
         """Show dialog to change API host and save to config."""
@@ -426,9 +670,9 @@ class MainWindow(QMainWindow):
 
     def _export_log(self) -> None:
         """Export log content to a file with date/timestamp in filename."""
-        log_content = self.log_text.toPlainText()
+        self._flush_log()
         
-        if not log_content.strip():
+        if not any(line.strip() for line in self._full_log_buffer):
             QMessageBox.information(self, "Export Log", "Log is empty. Nothing to export.")
             return
         
@@ -446,8 +690,9 @@ class MainWindow(QMainWindow):
         
         if file_path:
             try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(log_content)
+                # Stream the ring buffer straight to disk instead of joining it into one string
+                with open(file_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                    f.writelines(self._full_log_buffer)
                 self._append_log(f"✅ Log exported to: {file_path}\n")
                 QMessageBox.information(self, "Export Log", f"Log exported successfully to:\n{file_path}")
             except Exception as exc:
@@ -455,6 +700,9 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(self, "Export Failed", f"Failed to export log:\n{exc}")
 
     def _clear_log(self) -> None:
+        self._log_queue.clear()
+        self._full_log_buffer.clear()
+        self._log_at_line_start = True
         self.log_text.clear()
 
     def _ensure_firmware_file(self) -> Optional[str]:
@@ -468,15 +716,25 @@ class MainWindow(QMainWindow):
         url = item["url"]
         filename = os.path.basename(url)
         self._append_log(f"Downloading firmware: {url}\n")
+        # Download to a .part file and rename only once complete, so an interrupted
+        # download never leaves a truncated image under the firmware's real name
+        part_filename = filename + ".part"
         try:
-            r = requests.get(url, timeout=60)
-            r.raise_for_status()
-            with open(filename, "wb") as f:
-                f.write(r.content)
+            # Stream to disk so the whole image is never held in memory
+            with _get_session().get(url, stream=True, timeout=(3.05, 60)) as r:
+                r.raise_for_status()
+                with open(part_filename, "wb") as f:
+                    for chunk in r.iter_content(chunk_size=65536):
+                        f.write(chunk)
+            os.replace(part_filename, filename)
             self._append_log(f"Saved firmware to {filename}\n")
             self.downloaded_fw_path = os.path.abspath(filename)
             return self.downloaded_fw_path
         except Exception as exc:
+            try:
+                os.remove(part_filename)
+            except OSError:
+                pass
             QMessageBox.critical(self, "Download failed", str(exc))
         return None
  
@@ -531,7 +789,7 @@ class MainWindow(QMainWindow):
         self.flash_btn.setEnabled(False)
         self.erase_flash_btn.setEnabled(False)  # Disable erase while flashing
 
-        # Use EsptoolWorker to run esptool directly (works in both dev and bundled mode)
+        # Use EsptoolWorker to run esptool in its own process (works in both dev and bundled mode)
         self.esptool_worker = EsptoolWorker(esptool_args)
         self.esptool_worker.output_received.connect(self._append_log)
         self.esptool_worker.finished_signal.connect(self._flash_finished)
@@ -606,7 +864,7 @@ class MainWindow(QMainWindow):
         self.erase_flash_btn.setEnabled(False)
         self.flash_btn.setEnabled(False)  # Disable flash while erasing
         
-        # Use EsptoolWorker to run esptool directly (works in both dev and bundled mode)
+        # Use EsptoolWorker to run esptool in its own process (works in both dev and bundled mode)
         self.esptool_worker = EsptoolWorker(esptool_args)
         self.esptool_worker.output_received.connect(self._append_log)
         self.esptool_worker.finished_signal.connect(self._erase_flash_finished)
@@ -628,55 +886,72 @@ class MainWindow(QMainWindow):
             self._start_serial_monitor()
 
 
-class EsptoolWorker(QThread):
-    """Worker thread to run esptool commands without subprocess"""
+class EsptoolWorker(QObject):
+    """Runs esptool in a separate process so it does not hold the GUI's GIL"""
     output_received = Signal(str)
     finished_signal = Signal(int)  # exit code
-    
+
     def __init__(self, args_list: list) -> None:
         super().__init__()
         self.args_list = args_list
-    
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._process = QProcess(self)
+        # Merge stderr into stdout so both reach the log in order
+        self._process.setProcessChannelMode(QProcess.MergedChannels)
+        self._process.readyReadStandardOutput.connect(self._read_output)
+        self._process.finished.connect(self._on_finished)
+        self._process.errorOccurred.connect(self._on_error)
+
+    def start(self) -> None:
+        self._process.setProgram(sys.executable)
+        # The child would otherwise write in the locale encoding (cp1252 on Windows),
+        # while _read_output decodes UTF-8
+        env = QProcessEnvironment.systemEnvironment()
+        env.insert("PYTHONIOENCODING", "utf-8")
+        self._process.setProcessEnvironment(env)
+        if getattr(sys, 'frozen', False):
+            # A bundled executable has no -m, so it runs esptool itself via main()
+            self._process.setArguments([ESPTOOL_ARG, *self.args_list])
+        else:
+            # -u keeps the child's stdout unbuffered so progress streams live
+            self._process.setArguments(['-u', '-m', 'esptool', *self.args_list])
+        self._process.start()
+
+    def isRunning(self) -> bool:
+        return self._process.state() != QProcess.NotRunning
+
+    def _read_output(self) -> None:
+        text = self._decoder.decode(bytes(self._process.readAllStandardOutput()))
+        if text:
+            self.output_received.emit(text)
+
+    def _on_finished(self, exit_code: int, exit_status: QProcess.ExitStatus) -> None:
+        self._read_output()
+        text = self._decoder.decode(b'', final=True)
+        if text:
+            self.output_received.emit(text)
+        if exit_status != QProcess.NormalExit and exit_code == 0:
+            exit_code = 1
+        self.finished_signal.emit(exit_code)
+
+    def _on_error(self, error: QProcess.ProcessError) -> None:
+        # finished is not emitted when the process never started
+        if error == QProcess.FailedToStart:
+            self.output_received.emit(f"\n❌ Esptool error: {self._process.errorString()}\n")
+            self.finished_signal.emit(1)
+
+
+class PortScanner(QThread):
+    """One-shot worker thread that lists available serial ports"""
+    ports_ready = Signal(list)  # [(device, description), ...]
+
     def run(self) -> None:
         try:
-            import esptool
-            # Capture stdout and stderr
-            stdout_capture = io.StringIO()
-            stderr_capture = io.StringIO()
-            
-            # Save original sys.argv
-            original_argv = sys.argv
-            
-            try:
-                # Set sys.argv to esptool arguments (skip "python -m esptool" part)
-                sys.argv = ['esptool'] + self.args_list
-                
-                exit_code = 0
-                # Redirect stdout and stderr
-                with contextlib.redirect_stdout(stdout_capture), contextlib.redirect_stderr(stderr_capture):
-                    try:
-                        esptool.main()
-                    except SystemExit as e:
-                        exit_code = e.code if e.code is not None else 0
-                
-                # Emit captured output
-                stdout_text = stdout_capture.getvalue()
-                stderr_text = stderr_capture.getvalue()
-                
-                if stdout_text:
-                    self.output_received.emit(stdout_text)
-                if stderr_text:
-                    self.output_received.emit(stderr_text)
-                
-                self.finished_signal.emit(exit_code)
-                
-            finally:
-                # Restore original sys.argv
-                sys.argv = original_argv
-                
-        except Exception as exc:
-            self.output_received.emit(f"\n❌ Esptool error: {exc}\n")
-            self.finished_signal.emit(1)
+            import serial.tools.list_ports
+            ports = [(p.device, p.description) for p in serial.tools.list_ports.comports()]
+        except Exception:
+            ports = []
+        self.ports_ready.emit(ports)
 
 
 class SerialReader(QThread):
@@ -688,89 +963,60 @@ class SerialReader(QThread):
         self._port = port
         self._baud = baudrate
         self._running = True
-        self._ser: Optional[serial.Serial] = None
+        self._ser: Optional["serial.Serial"] = None
         self._buffer = bytearray()
+        # Keeps state across reads so multi-byte characters split between chunks decode correctly
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
 
     def run(self) -> None:
         try:
-            self._ser = serial.Serial(self._port, self._baud, timeout=0.2)
+            import serial
+            self._ser = serial.Serial(self._port, self._baud, timeout=0.05)
         except Exception as exc:
             self.error.emit(f"Open failed on {self._port}: {exc}")
             return
         try:
-            last_flush_time = time.time()
             while self._running:
                 try:
-                    if self._ser.in_waiting:
-                        # Read available data
-                        new_data = self._ser.read(self._ser.in_waiting)
-                        if new_data:
-                            self._buffer.extend(new_data)
-                            last_flush_time = time.time()
-                            
-                            # Process buffered data looking for complete lines
-                            while True:
-                                # Try to find line breaks
-                                newline_idx = -1
-                                for idx, byte in enumerate(self._buffer):
-                                    if byte in (10, 13):  # \n or \r
-                                        newline_idx = idx
-                                        break
-                                
-                                if newline_idx >= 0:
-                                    # Found a line break, decode up to and including it
-                                    line_bytes = self._buffer[:newline_idx + 1]
-                                    self._buffer = self._buffer[newline_idx + 1:]
-                                    
-                                    try:
-                                        text = line_bytes.decode('utf-8', errors='replace')
-                                        self.text_received.emit(text)
-                                    except Exception:
-                                        # Fallback to latin-1 if UTF-8 fails
-                                        text = line_bytes.decode('latin-1', errors='replace')
-                                        self.text_received.emit(text)
-                                else:
-                                    # No line break found
-                                    # Flush if buffer is large (reduced threshold)
-                                    if len(self._buffer) > 256:
-                                        chunk = bytes(self._buffer)
-                                        self._buffer.clear()
-                                        try:
-                                            text = chunk.decode('utf-8', errors='replace')
-                                            self.text_received.emit(text)
-                                        except Exception:
-                                            text = chunk.decode('latin-1', errors='replace')
-                                            self.text_received.emit(text)
-                                    break
-                    else:
-                        # No data available, check if we should flush buffer due to timeout
-                        current_time = time.time()
-                        if self._buffer and (current_time - last_flush_time) > 0.1:  # 100ms timeout
-                            # Flush any pending data
-                            chunk = bytes(self._buffer)
+                    # Block until data arrives or the read timeout expires
+                    new_data = self._ser.read(4096)
+                    if new_data:
+                        self._buffer.extend(new_data)
+
+                        # Decode everything up to the last line break in one go and
+                        # emit once per read, since each emit is a queued cross-thread
+                        # event for the UI
+                        pending = []
+                        end = max(self._buffer.rfind(10), self._buffer.rfind(13)) + 1
+                        if end:
+                            pending.append(self._decoder.decode(bytes(self._buffer[:end])))
+                            del self._buffer[:end]
+
+                        # No line break left
+                        # Flush if buffer is large (reduced threshold)
+                        if len(self._buffer) > 256:
+                            pending.append(self._decoder.decode(bytes(self._buffer)))
                             self._buffer.clear()
-                            try:
-                                text = chunk.decode('utf-8', errors='replace')
-                                if text:
-                                    self.text_received.emit(text)
-                            except Exception:
-                                text = chunk.decode('latin-1', errors='replace')
-                                if text:
-                                    self.text_received.emit(text)
-                            last_flush_time = current_time
+
+                        text = "".join(pending)
+                        if text:
+                            self.text_received.emit(text)
+                    elif self._buffer:
+                        # Read timed out with no new data, flush any pending partial line
+                        chunk = bytes(self._buffer)
+                        self._buffer.clear()
+                        text = self._decoder.decode(chunk)
+                        if text:
+                            self.text_received.emit(text)
                 except Exception as exc:
                     self.error.emit(f"Read error: {exc}")
                     self.msleep(100)
-                self.msleep(10)  # Reduced sleep time for more responsive updates
-            
-            # Flush any remaining buffer on exit
-            if self._buffer:
-                try:
-                    text = bytes(self._buffer).decode('utf-8', errors='replace')
-                    if text:
-                        self.text_received.emit(text)
-                except Exception:
-                    pass
+
+            # Flush any remaining buffer and incomplete characters on exit
+            text = self._decoder.decode(bytes(self._buffer), final=True)
+            self._buffer.clear()
+            if text:
+                self.text_received.emit(text)
         finally:
             try:
                 if self._ser and self._ser.is_open:
@@ -789,8 +1035,24 @@ class SerialReader(QThread):
             self.error.emit(f"Write error: {exc}")
 
 
+def _run_esptool(args_list: list) -> None:
+    """Run esptool as if invoked with "python -m esptool"."""
+    # Output goes to a pipe, which is block-buffered by default; flush per line
+    # so the GUI shows progress as it happens rather than in large bursts.
+    # Write UTF-8 to match what EsptoolWorker decodes, whatever the locale is
+    for stream in (sys.stdout, sys.stderr):
+        if stream is not None and hasattr(stream, 'reconfigure'):
+            stream.reconfigure(encoding='utf-8', line_buffering=True)
+    sys.argv = ['esptool'] + args_list
+    runpy.run_module('esptool', run_name='__main__', alter_sys=True)
+
+
 def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == ESPTOOL_ARG:
+        _run_esptool(sys.argv[2:])
+        return
     app = QApplication(sys.argv)
+    app.setStyleSheet(APP_STYLESHEET)
     w = MainWindow()
     w.show()
     sys.exit(app.exec())
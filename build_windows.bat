@@ -19,7 +19,7 @@ python --version
 
 echo.
 echo [2/4] Installing/updating required packages...
-pip install --upgrade PyInstaller PySide6 pyserial requests esptool
+pip install --upgrade PyInstaller PySide6 pyserial requests orjson esptool
 
 echo.
 echo [3/4] Checking required files...